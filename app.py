@@ -1,29 +1,82 @@
 from flask import Flask, render_template, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import requests
 import socket
 import dns.resolver
+import dns.message
+import dns.query
+import dns.rcode
+import dns.rdatatype
+import dns.flags
+import dns.inet
 import re
 from datetime import datetime, timedelta
 import urllib3
 import os
+import sys
+import json
+import argparse
+import heapq
+import hmac
+import threading
+from collections import Counter
+import random
+import selectors
+from concurrent.futures import ThreadPoolExecutor
+import time
 import whois
 from bs4 import BeautifulSoup
 import ssl
 import OpenSSL
 from urllib.parse import urlparse
+import orjson
 
 # Suppress SSL warnings for sites with invalid certificates
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+def dumps_json(obj, sort_keys=False, default=None):
+    """Serialize to a compact UTF-8 JSON string with orjson"""
+    option = orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    try:
+        return orjson.dumps(obj, default=default, option=option).decode('utf-8')
+    except (orjson.JSONEncodeError, TypeError):
+        # e.g. integers wider than 64 bits, which orjson rejects
+        return json.dumps(obj, sort_keys=sort_keys, default=default, ensure_ascii=False, separators=(',', ':'))
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by dumps_json (same output shape as the default).
+
+    orjson output is always compact and UTF-8, so ensure_ascii defaults to
+    False here. Setting ensure_ascii back to True, or pretty-printing
+    (compact=False / debug mode), uses the stdlib encoder instead.
+    """
+
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.get('indent') or kwargs.get('ensure_ascii', self.ensure_ascii):
+            return super().dumps(obj, **kwargs)
+        return dumps_json(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys),
+                          default=kwargs.get('default', self.default))
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 limiter = Limiter(key_func=get_remote_address, app=app, default_limits=["200/day", "50/hour"])
 
 # Version info - set via environment variables during build
 VERSION = os.environ.get('APP_VERSION', 'dev')
 BUILD_TIME = os.environ.get('BUILD_TIME', 'local')
 
+# Request profiling - disabled unless PROFILE_SAMPLE_RATE or PROFILE_TOKEN is set
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '20'))
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL_MS', '5')) / 1000
+
 # CDN signatures - streamlined for production
 CDNS = {
     'CloudFlare': {'headers': ['cf-ray', 'cf-cache-status'], 'cname': r'\.cloudflare\.'},
@@ -323,7 +376,15 @@ def get_domain_info(domain):
     
     return None
 
-def get_email_security(domain):
+def lookup_records(name, rdtype, dns_answers=None):
+    """Resolve name/rdtype, using answers prefetched by a ResolverPool when available"""
+    if dns_answers is not None:
+        key = (name.lower().rstrip('.'), rdtype)
+        if key in dns_answers:
+            return dns_answers[key]
+    return dns.resolver.resolve(name, rdtype)
+
+def get_email_security(domain, dns_answers=None):
     """Check email security records (SPF, DMARC, MX)"""
     email_sec = {'spf': None, 'dmarc': None, 'mx': []}
     
@@ -333,7 +394,7 @@ def get_email_security(domain):
     try:
         # Check SPF
         try:
-            spf_records = dns.resolver.resolve(clean_domain, 'TXT')
+            spf_records = lookup_records(clean_domain, 'TXT', dns_answers)
             for record in spf_records:
                 txt = str(record)
                 if 'v=spf1' in txt:
@@ -346,7 +407,7 @@ def get_email_security(domain):
         
         # Check DMARC
         try:
-            dmarc_records = dns.resolver.resolve(f'_dmarc.{clean_domain}', 'TXT')
+            dmarc_records = lookup_records(f'_dmarc.{clean_domain}', 'TXT', dns_answers)
             for record in dmarc_records:
                 txt = str(record)
                 if 'v=DMARC1' in txt:
@@ -359,7 +420,7 @@ def get_email_security(domain):
         
         # Check MX records
         try:
-            mx_records = dns.resolver.resolve(clean_domain, 'MX')
+            mx_records = lookup_records(clean_domain, 'MX', dns_answers)
             email_sec['mx'] = [str(r.exchange) for r in mx_records]
         except:
             email_sec['mx'] = []
@@ -441,69 +502,364 @@ def validate_url(url):
     
     return url, None
 
-def check_cdn(url):
-    """Main CDN detection logic with improved error handling"""
+def extract_domain(url):
+    """Extract the bare domain from a validated URL"""
+    return url.replace('https://', '').replace('http://', '').split('/')[0].split(':')[0]
+
+def cname_candidates(domain):
+    """Names checked for CDN CNAME records (the domain and its www/non-www twin)"""
+    return [domain, 'www.' + domain if not domain.startswith('www.') else domain[4:]]
+
+def dns_queries_for(domain):
+    """All (name, rdtype) lookups a check of domain performs"""
+    clean_domain = domain.replace('www.', '')
+    queries = [(d, 'CNAME') for d in cname_candidates(domain)]
+    queries += [(clean_domain, 'TXT'), (f'_dmarc.{clean_domain}', 'TXT'), (clean_domain, 'MX')]
+    return queries
+
+def answer_records(response, rdtype):
+    """Records of rdtype in a DNS response's answer section"""
+    rdtype = dns.rdatatype.from_text(rdtype)
+    return [rdata for rrset in response.answer if rrset.rdtype == rdtype for rdata in rrset]
+
+class ResolverPool:
+    """Pipelined DNS resolver for bulk checks.
+
+    Spreads queries round-robin across a set of upstream nameservers, keeping
+    up to max_outstanding queries in flight over one shared UDP socket per
+    upstream (responses are matched by message ID). Queries advertise a
+    1232-byte EDNS buffer so most TXT answers fit in one datagram; answers
+    that still come back truncated are re-sent over TCP in worker threads
+    after the UDP pass. Timeouts and SERVFAIL/REFUSED answers are retried on
+    the next upstream with exponential backoff, up to `attempts` tries per
+    lookup. Per-upstream latency, including TCP follow-ups, is kept in stats.
+    """
+
+    RETRY_RCODES = (dns.rcode.SERVFAIL, dns.rcode.REFUSED)
+    EDNS_PAYLOAD = 1232
+
+    def __init__(self, nameservers=None, timeout=2.0, attempts=3, backoff=0.1,
+                 max_outstanding=256, port=53, tcp_workers=16):
+        if not nameservers:
+            nameservers = dns.resolver.get_default_resolver().nameservers
+        self.nameservers = list(nameservers)
+        self.timeout = timeout
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_outstanding = max_outstanding
+        self.port = port
+        self.tcp_workers = tcp_workers
+        self.stats = {ns: {'queries': 0, 'replies': 0, 'answers': 0, 'timeouts': 0, 'servfail': 0,
+                           'truncated': 0, 'tcp_errors': 0, 'total_ms': 0.0}
+                      for ns in self.nameservers}
+
+    def resolve_many(self, queries):
+        """Resolve (name, rdtype) pairs concurrently.
+
+        Returns {(name, rdtype): [rdata, ...]} with lower-cased names; an empty
+        list means NXDOMAIN or no records. Lookups that still fail after all
+        attempts are left out so callers fall back to the system resolver.
+        """
+        keys = list(dict.fromkeys((name.lower().rstrip('.'), rdtype) for name, rdtype in queries))
+        results = {}
+        if not keys or not self.nameservers:
+            return results
+
+        batch = _UDPBatch(self, keys, results)
+        try:
+            batch.run()
+        finally:
+            batch.close()
+        self._resolve_truncated(batch.truncated, results)
+        return results
+
+    def _resolve_truncated(self, truncated, results):
+        """Re-send truncated UDP lookups over TCP to the upstream that answered"""
+        if not truncated:
+            return
+
+        def exchange(item):
+            key, idx, query = item
+            start = time.monotonic()
+            try:
+                response = dns.query.tcp(query, self.nameservers[idx], timeout=self.timeout, port=self.port)
+            except Exception:
+                response = None
+            return key, idx, response, (time.monotonic() - start) * 1000
+
+        with ThreadPoolExecutor(max_workers=min(self.tcp_workers, len(truncated))) as executor:
+            for key, idx, response, elapsed_ms in executor.map(exchange, truncated):
+                stats = self.stats[self.nameservers[idx]]
+                stats['total_ms'] += elapsed_ms
+                if response is None or response.rcode() in self.RETRY_RCODES:
+                    stats['tcp_errors'] += 1
+                else:
+                    stats['answers'] += 1
+                    results[key] = answer_records(response, key[1])
+
+    def report(self):
+        """Per-upstream query counts and average latency"""
+        report = {}
+        for ns, st in self.stats.items():
+            report[ns] = {
+                'queries': st['queries'],
+                'answers': st['answers'],
+                'timeouts': st['timeouts'],
+                'servfail': st['servfail'],
+                'truncated': st['truncated'],
+                'tcp_errors': st['tcp_errors'],
+                'avg_ms': round(st['total_ms'] / st['replies'], 2) if st['replies'] else None,
+            }
+        return report
+
+class _UDPBatch:
+    """State of the UDP pass of one ResolverPool.resolve_many() call"""
+
+    def __init__(self, pool, keys, results):
+        self.pool = pool
+        self.results = results
+        self.truncated = []  # (key, upstream index, query) to re-send over TCP
+        # Heap of (not_before, seq, key, attempt, upstream index); seq keeps ordering stable
+        self.pending = [(0.0, seq, key, 0, seq % len(pool.nameservers)) for seq, key in enumerate(keys)]
+        self.seq = len(self.pending)
+        self.inflight = {}  # (upstream index, message id) -> (key, attempt, sent_at, query)
+        self.selector = selectors.DefaultSelector()
+        self.socks = []
+        for idx, ns in enumerate(pool.nameservers):
+            sock = socket.socket(dns.inet.af_for_address(ns), socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            sock.connect((ns, pool.port))
+            self.selector.register(sock, selectors.EVENT_READ, idx)
+            self.socks.append(sock)
+
+    def close(self):
+        self.selector.close()
+        for sock in self.socks:
+            sock.close()
+
+    def run(self):
+        while self.pending or self.inflight:
+            self.send_ready(time.monotonic())
+            for sel_key, _ in self.selector.select(self.wait_time(time.monotonic())):
+                self.receive(sel_key.data, sel_key.fileobj)
+            self.expire(time.monotonic())
+
+    def retry(self, key, attempt, idx, now):
+        """Schedule another attempt on the next upstream, with exponential backoff"""
+        if attempt + 1 < self.pool.attempts:
+            next_idx = (idx + 1) % len(self.socks)
+            delay = self.pool.backoff * (2 ** attempt)
+            heapq.heappush(self.pending, (now + delay, self.seq, key, attempt + 1, next_idx))
+            self.seq += 1
+
+    def send_ready(self, now):
+        """Fill the pipeline with lookups whose backoff has elapsed"""
+        while self.pending and len(self.inflight) < self.pool.max_outstanding and self.pending[0][0] <= now:
+            _, _, key, attempt, idx = heapq.heappop(self.pending)
+            query = dns.message.make_query(key[0], key[1], use_edns=0, payload=self.pool.EDNS_PAYLOAD)
+            while (idx, query.id) in self.inflight:
+                query.id = random.randint(0, 0xFFFF)
+            try:
+                self.socks[idx].send(query.to_wire())
+            except OSError:
+                self.retry(key, attempt, idx, now)
+                continue
+            self.pool.stats[self.pool.nameservers[idx]]['queries'] += 1
+            self.inflight[(idx, query.id)] = (key, attempt, now, query)
+
+    def wait_time(self, now):
+        """Seconds until the next timeout or scheduled retry"""
+        wake = [sent_at + self.pool.timeout for _, _, sent_at, _ in self.inflight.values()]
+        if self.pending and len(self.inflight) < self.pool.max_outstanding:
+            wake.append(self.pending[0][0])
+        return max(0.0, min(wake) - now) if wake else 0.0
+
+    def receive(self, idx, sock):
+        """Drain one upstream socket, matching replies to queries by message ID"""
+        while True:
+            try:
+                wire = sock.recv(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # e.g. ICMP port unreachable; the query will time out
+                return
+            try:
+                response = dns.message.from_wire(wire)
+            except Exception:
+                continue
+            entry = self.inflight.get((idx, response.id))
+            if entry is None or not entry[3].is_response(response):
+                continue
+            del self.inflight[(idx, response.id)]
+            self.handle(idx, entry, response, time.monotonic())
+
+    def handle(self, idx, entry, response, now):
+        key, attempt, sent_at, query = entry
+        stats = self.pool.stats[self.pool.nameservers[idx]]
+        stats['replies'] += 1
+        stats['total_ms'] += (now - sent_at) * 1000
+        if response.flags & dns.flags.TC:
+            stats['truncated'] += 1
+            self.truncated.append((key, idx, query))
+        elif response.rcode() in self.pool.RETRY_RCODES:
+            stats['servfail'] += 1
+            self.retry(key, attempt, idx, now)
+        else:
+            stats['answers'] += 1
+            self.results[key] = answer_records(response, key[1])
+
+    def expire(self, now):
+        """Drop queries that have waited longer than the timeout and retry them"""
+        for inflight_key, (key, attempt, sent_at, _) in list(self.inflight.items()):
+            if now - sent_at >= self.pool.timeout:
+                del self.inflight[inflight_key]
+                self.pool.stats[self.pool.nameservers[inflight_key[0]]]['timeouts'] += 1
+                self.retry(key, attempt, inflight_key[0], now)
+
+class CheckResult:
+    """Typed result of a single CDN check.
+
+    Uses __slots__ to keep per-result memory low in bulk runs. Low-cardinality
+    names (CDN, CMS, server, hosting provider) are interned and response
+    headers are only kept when requested.
+    """
+
+    # Keys that are always present in the /api/check response
+    BASE_FIELDS = ('url', 'cdn_detected', 'confidence', 'evidence',
+                   'ip_address', 'cnames', 'headers', 'timestamp')
+    # Keys that are only present in the response once they have been set
+    OPTIONAL_FIELDS = ('error', 'cms', 'cms_version', 'server', 'language',
+                       'frameworks', 'analytics', 'security', 'ssl',
+                       'domain_info', 'email_security', 'hosting_provider',
+                       'performance')
+
+    __slots__ = BASE_FIELDS + OPTIONAL_FIELDS
+
+    def __init__(self, url, timestamp):
+        self.url = url
+        self.cdn_detected = None
+        self.confidence = 0
+        self.evidence = []
+        self.ip_address = None
+        self.cnames = []
+        self.headers = None
+        self.timestamp = timestamp
+        for field in self.OPTIONAL_FIELDS:
+            setattr(self, field, None)
+
+    def set_name(self, field, value):
+        """Set a low-cardinality name field (CDN, CMS, server, hosting), interning its value"""
+        setattr(self, field, sys.intern(value) if isinstance(value, str) else value)
+
+    def to_dict(self):
+        """Full representation, backward compatible with the /api/check JSON shape"""
+        data = {field: getattr(self, field) for field in self.BASE_FIELDS}
+        if data['headers'] is None:
+            data['headers'] = {}
+        for field in self.OPTIONAL_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        return data
+
+    def to_compact(self):
+        """Flat, compact representation for JSONL/bulk output.
+
+        Drops headers and evidence, flattens the nested security/SSL/email
+        sections and omits empty values.
+        """
+        ssl_info = self.ssl or {}
+        email_sec = self.email_security or {}
+        data = {
+            'url': self.url,
+            'cdn': self.cdn_detected,
+            'confidence': self.confidence,
+            'ip': self.ip_address,
+            'cnames': self.cnames,
+            'cms': self.cms,
+            'cms_version': self.cms_version,
+            'server': self.server,
+            'hosting': self.hosting_provider,
+            'security_grade': (self.security or {}).get('grade'),
+            'tls': ssl_info.get('tls_version'),
+            'ssl_days': ssl_info.get('days_remaining'),
+            'spf': email_sec.get('spf'),
+            'dmarc': email_sec.get('dmarc'),
+            'mx': email_sec.get('mx'),
+            'response_ms': (self.performance or {}).get('response_time_ms'),
+            'error': self.error,
+            'ts': self.timestamp,
+        }
+        return {k: v for k, v in data.items() if v is not None and v != []}
+
+def check_cdn(url, include_headers=True, dns_answers=None, target=None):
+    """Main CDN detection logic with improved error handling.
+
+    Returns a CheckResult; response headers are only stored when
+    include_headers is set. In bulk mode, dns_answers holds records prefetched
+    by ResolverPool.resolve_many() and target the (validated_url, domain) pair
+    already computed for the prefetch.
+    """
     start_time = datetime.now()  # Track start time for performance metrics
-    result = {'url': url, 'cdn_detected': None, 'confidence': 0, 'evidence': [], 
-              'ip_address': None, 'cnames': [], 'headers': {}, 'timestamp': start_time.isoformat()}
+    result = CheckResult(url, start_time.isoformat())
     
-    # Validate URL
-    validated_url, error = validate_url(url)
-    if error:
-        result['error'] = error
-        return result
+    # Validate URL and extract domain
+    if target is None:
+        validated_url, error = validate_url(url)
+        if error:
+            result.error = error
+            return result
+        target = (validated_url, extract_domain(validated_url))
     
-    url = validated_url
-    result['url'] = url
+    url, domain = target
+    result.url = url
     
     try:
-        # Extract domain from URL
-        domain = url.replace('https://', '').replace('http://', '').split('/')[0].split(':')[0]
-        
         # Get headers and HTML content with better error handling
         html_content = None
         try:
             response = requests.get(url, timeout=10, allow_redirects=True, verify=True)
-            result['headers'] = dict(response.headers)
+            result.headers = dict(response.headers) if include_headers else None
             headers = response.headers
             html_content = response.text[:50000]  # Only first 50KB for CMS detection
         except requests.exceptions.SSLError:
             # Try without SSL verification if certificate is invalid
             try:
                 response = requests.get(url, timeout=10, allow_redirects=True, verify=False)
-                result['headers'] = dict(response.headers)
+                result.headers = dict(response.headers) if include_headers else None
                 headers = response.headers
                 html_content = response.text[:50000]  # Only first 50KB for CMS detection
-                result['evidence'].append('⚠️ SSL certificate verification failed - results may be inaccurate')
+                result.evidence.append('⚠️ SSL certificate verification failed - results may be inaccurate')
             except Exception as e:
-                result['error'] = f'Unable to connect to website. The site may be down or unreachable.'
+                result.error = f'Unable to connect to website. The site may be down or unreachable.'
                 return result
         except requests.exceptions.ConnectionError:
-            result['error'] = f'Connection failed. The website "{domain}" could not be reached. Please verify the URL is correct.'
+            result.error = f'Connection failed. The website "{domain}" could not be reached. Please verify the URL is correct.'
             return result
         except requests.exceptions.Timeout:
-            result['error'] = f'Connection timeout. The website "{domain}" took too long to respond.'
+            result.error = f'Connection timeout. The website "{domain}" took too long to respond.'
             return result
         except requests.exceptions.TooManyRedirects:
-            result['error'] = 'Too many redirects. The website may have a redirect loop.'
+            result.error = 'Too many redirects. The website may have a redirect loop.'
             return result
         except requests.exceptions.RequestException as e:
-            result['error'] = f'Unable to check website. Please verify the URL is correct and accessible.'
+            result.error = f'Unable to check website. Please verify the URL is correct and accessible.'
             return result
         
         # Get IP address
         try:
-            result['ip_address'] = socket.gethostbyname(domain)
+            result.ip_address = socket.gethostbyname(domain)
         except socket.gaierror:
-            result['error'] = f'Domain "{domain}" does not exist or cannot be resolved.'
+            result.error = f'Domain "{domain}" does not exist or cannot be resolved.'
             return result
         except Exception as e:
-            result['evidence'].append('⚠️ Could not resolve IP address')
+            result.evidence.append('⚠️ Could not resolve IP address')
         
         # Get CNAMEs
-        for d in [domain, 'www.' + domain if not domain.startswith('www.') else domain[4:]]:
+        for d in cname_candidates(domain):
             try:
-                result['cnames'].extend([str(r.target) for r in dns.resolver.resolve(d, 'CNAME')])
+                result.cnames.extend([str(r.target) for r in lookup_records(d, 'CNAME', dns_answers)])
             except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers):
                 pass
             except Exception:
@@ -516,74 +872,214 @@ def check_cdn(url):
             for h in sigs['headers']:
                 if any(h.lower() in k.lower() for k in headers.keys()):
                     score += 3
-                    result['evidence'].append(f"Header '{h}' → {cdn}")
-            for cname in result['cnames']:
+                    result.evidence.append(f"Header '{h}' → {cdn}")
+            for cname in result.cnames:
                 if re.search(sigs['cname'], cname.lower()):
                     score += 4
-                    result['evidence'].append(f"CNAME '{cname}' → {cdn}")
+                    result.evidence.append(f"CNAME '{cname}' → {cdn}")
             if score > 0:
                 scores[cdn] = score
         
         if scores:
-            result['cdn_detected'] = max(scores, key=scores.get)
-            result['confidence'] = min(scores[result['cdn_detected']] * 10, 100)
+            result.set_name('cdn_detected', max(scores, key=scores.get))
+            result.confidence = min(scores[result.cdn_detected] * 10, 100)
         else:
-            result['cdn_detected'] = 'None detected'
+            result.set_name('cdn_detected', 'None detected')
         
         # Detect CMS
         cms_info = detect_cms(url, headers, html_content)
         if cms_info['name']:
-            result['cms'] = cms_info['name']
+            result.set_name('cms', cms_info['name'])
             if cms_info['version']:
-                result['cms_version'] = cms_info['version']
-                result['evidence'].append(f"CMS: {cms_info['name']} {cms_info['version']}")
+                result.cms_version = cms_info['version']
+                result.evidence.append(f"CMS: {cms_info['name']} {cms_info['version']}")
             else:
-                result['evidence'].append(f"CMS: {cms_info['name']}")
+                result.evidence.append(f"CMS: {cms_info['name']}")
         
         # Detect technologies
         tech = detect_technologies(headers, html_content)
         if tech['server']:
-            result['server'] = tech['server']
+            result.set_name('server', tech['server'])
         if tech['language']:
-            result['language'] = tech['language']
+            result.language = tech['language']
         if tech['frameworks']:
-            result['frameworks'] = tech['frameworks']
+            result.frameworks = tech['frameworks']
         if tech['analytics']:
-            result['analytics'] = tech['analytics']
+            result.analytics = tech['analytics']
         
         # Analyze security headers
         security = analyze_security_headers(headers)
-        result['security'] = security
+        result.security = security
         
         # Get SSL information
         ssl_info = get_ssl_info(domain)
         if 'error' not in ssl_info:
-            result['ssl'] = ssl_info
+            result.ssl = ssl_info
         
         # Get domain information
         domain_info = get_domain_info(domain)
         if domain_info:
-            result['domain_info'] = domain_info
+            result.domain_info = domain_info
         
         # Get email security
-        email_sec = get_email_security(domain)
-        result['email_security'] = email_sec
+        email_sec = get_email_security(domain, dns_answers)
+        result.email_security = email_sec
         
         # Detect hosting provider
-        if result.get('ip_address'):
-            hosting = detect_hosting_provider(result['ip_address'], domain)
-            result['hosting_provider'] = hosting
+        if result.ip_address:
+            hosting = detect_hosting_provider(result.ip_address, domain)
+            result.set_name('hosting_provider', hosting)
         
         # Get performance metrics
         end_time = datetime.now()
         metrics = get_performance_metrics(response, start_time)
-        result['performance'] = metrics
+        result.performance = metrics
             
     except Exception as e:
-        result['error'] = f'An unexpected error occurred while checking the website.'
+        result.error = f'An unexpected error occurred while checking the website.'
     
     return result
 
+class StackSampler:
+    """Samples the calling thread's Python stack from a background thread.
+
+    Sampling is wall-clock, so frames blocked on I/O (whois, TLS handshake) and
+    frames waiting for the GIL are sampled alike; profiled_check_cdn records
+    the thread's CPU time next to the wall time to tell them apart. Frames are
+    named module:qualname and counted as collapsed stacks ("outer;inner
+    count"), the input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+class ProfileStore:
+    """Thread-safe store keeping only the slowest N profiled checks.
+
+    Traces live in process memory, so with several gunicorn workers each
+    worker keeps (and /api/profiles returns) only its own traces.
+    """
+
+    def __init__(self, keep=PROFILE_KEEP):
+        self.keep = keep
+        self._heap = []  # min-heap on duration, so the fastest trace is evicted first
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def add(self, trace):
+        with self._lock:
+            self._seq += 1
+            heapq.heappush(self._heap, (trace['duration_ms'], self._seq, trace))
+            if len(self._heap) > self.keep:
+                heapq.heappop(self._heap)
+
+    def slowest(self):
+        with self._lock:
+            return [trace for _, _, trace in sorted(self._heap, key=lambda item: item[0], reverse=True)]
+
+profile_store = ProfileStore()
+
+def profile_token_valid(token):
+    """Constant-time check of a profiling token against PROFILE_TOKEN"""
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(token.encode('utf-8'), PROFILE_TOKEN.encode('utf-8'))
+
+def should_profile():
+    """Decide whether the current /api/check request is profiled"""
+    if PROFILE_TOKEN and profile_token_valid(request.headers.get('X-Profile-Token', '')):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+def profiled_check_cdn(url):
+    """Run check_cdn under the stack sampler and record the trace.
+
+    cpu_ms is the CPU time of the request thread; off_cpu_ms (wall minus CPU)
+    is time spent blocked on I/O or waiting for the GIL. A high off_cpu_ms
+    whose samples sit in pure-Python frames rather than socket calls points
+    at GIL contention.
+    """
+    started = datetime.now()
+    start = time.perf_counter()
+    cpu_start = time.thread_time()
+    with StackSampler() as sampler:
+        result = check_cdn(url)
+    duration_ms = (time.perf_counter() - start) * 1000
+    cpu_ms = (time.thread_time() - cpu_start) * 1000
+    profile_store.add({
+        'url': url,
+        'pid': os.getpid(),
+        'timestamp': started.isoformat(),
+        'duration_ms': round(duration_ms, 2),
+        'cpu_ms': round(cpu_ms, 2),
+        'off_cpu_ms': round(max(duration_ms - cpu_ms, 0.0), 2),
+        'samples': sum(sampler.stacks.values()),
+        'stacks': dict(sampler.stacks),
+    })
+    return result
+
+def bulk_check(urls, output, compact=True, resolver=None, batch_size=500):
+    """Check many URLs and write one JSON object per line (JSONL) to output.
+
+    With a ResolverPool, the CNAME/TXT/MX lookups for each batch of URLs are
+    resolved up front in one pipelined pass.
+    """
+    count = 0
+    batch = []
+    for url in urls:
+        url = url.strip()
+        if not url or url.startswith('#'):
+            continue
+        batch.append(url)
+        count += 1
+        if len(batch) >= batch_size:
+            check_batch(batch, output, compact, resolver)
+            batch = []
+    if batch:
+        check_batch(batch, output, compact, resolver)
+    return count
+
+def check_batch(batch, output, compact, resolver):
+    """Check one bulk batch, prefetching its DNS lookups through the resolver"""
+    # Validate each URL once; invalid ones go through check_cdn() as usual to get their error
+    targets = []
+    for url in batch:
+        validated_url, error = validate_url(url)
+        targets.append(None if error else (validated_url, extract_domain(validated_url)))
+    dns_answers = None
+    if resolver is not None:
+        queries = []
+        for target in targets:
+            if target is not None:
+                queries.extend(dns_queries_for(target[1]))
+        dns_answers = resolver.resolve_many(queries)
+    for url, target in zip(batch, targets):
+        result = check_cdn(url, include_headers=not compact, dns_answers=dns_answers, target=target)
+        record = result.to_compact() if compact else result.to_dict()
+        output.write(dumps_json(record) + '\n')
+
 @app.route('/')
 def index():
     return render_template('index.html', version=VERSION, build_time=BUILD_TIME)
@@ -596,12 +1092,63 @@ def api_check():
         return jsonify({'error': 'URL required'}), 400
     if len(data['url']) > 2048:
         return jsonify({'error': 'URL too long'}), 400
-    return jsonify(check_cdn(data['url']))
+    if should_profile():
+        return jsonify(profiled_check_cdn(data['url']).to_dict())
+    return jsonify(check_cdn(data['url']).to_dict())
+
+@app.route('/api/profiles')
+def api_profiles():
+    """Slowest profiled checks of the answering worker (pid in the output).
+
+    ?format=collapsed returns merged flamegraph input, with the worker pid in
+    the X-Profile-Worker response header.
+    """
+    if not PROFILE_TOKEN:
+        return jsonify({'error': 'Not found'}), 404
+    if not profile_token_valid(request.headers.get('X-Profile-Token', '')):
+        return jsonify({'error': 'Forbidden'}), 403
+
+    traces = profile_store.slowest()
+    if request.args.get('format') == 'collapsed':
+        merged = Counter()
+        for trace in traces:
+            merged.update(trace['stacks'])
+        body = ''.join(f'{stack} {count}\n' for stack, count in merged.most_common())
+        response = app.response_class(body, mimetype='text/plain')
+        response.headers['X-Profile-Worker'] = str(os.getpid())
+        return response
+    return jsonify({'pid': os.getpid(), 'traces': traces})
 
 @app.errorhandler(429)
 def ratelimit(e):
     return jsonify({'error': 'Rate limit exceeded'}), 429
 
 if __name__ == '__main__':
-    # Only for local development - use gunicorn in production
-    app.run(host='127.0.0.1', port=5000, debug=True)
+    parser = argparse.ArgumentParser(description='CDN Checker')
+    parser.add_argument('--bulk', metavar='FILE', help="Check every URL in FILE ('-' for stdin) and write JSONL")
+    parser.add_argument('--output', metavar='FILE', help='Write bulk results to FILE instead of stdout')
+    parser.add_argument('--full', action='store_true', help='Write the full /api/check result shape instead of the compact schema')
+    parser.add_argument('--nameservers', default=os.environ.get('BULK_NAMESERVERS', ''),
+                        help='Comma-separated upstream nameservers for bulk DNS lookups (default: system resolvers)')
+    parser.add_argument('--dns-concurrency', type=int, default=256, help='Maximum outstanding bulk DNS queries')
+    args = parser.parse_args()
+
+    if args.bulk:
+        nameservers = [ns.strip() for ns in args.nameservers.split(',') if ns.strip()]
+        resolver = ResolverPool(nameservers, max_outstanding=args.dns_concurrency)
+        source = sys.stdin if args.bulk == '-' else open(args.bulk, encoding='utf-8')
+        output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            bulk_check(source, output, compact=not args.full, resolver=resolver)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if output is not sys.stdout:
+                output.close()
+        for ns, st in resolver.report().items():
+            print(f"DNS {ns}: {st['queries']} queries, {st['answers']} answers, {st['timeouts']} timeouts, "
+                  f"{st['servfail']} servfail, {st['truncated']} truncated ({st['tcp_errors']} TCP errors), "
+                  f"avg {st['avg_ms']} ms", file=sys.stderr)
+    else:
+        # Only for local development - use gunicorn in production
+        app.run(host='127.0.0.1', port=5000, debug=True)
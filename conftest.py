@@ -0,0 +1,14 @@
+import pytest
+
+import app
+
+# test_app.py is a manual smoke test against a running server, not a pytest module
+collect_ignore = ['test_app.py']
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit():
+    """Keep Flask-Limiter from rejecting repeated test-client requests"""
+    app.limiter.enabled = False
+    yield
+    app.limiter.enabled = True
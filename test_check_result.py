@@ -0,0 +1,121 @@
+"""
+Backward-compatibility tests for the CheckResult model and JSON output
+"""
+
+import json
+
+import dns.resolver
+import pytest
+from requests.structures import CaseInsensitiveDict
+
+import app
+
+# Keys of the dict check_cdn() returned before CheckResult was introduced
+LEGACY_BASE_KEYS = {'url', 'cdn_detected', 'confidence', 'evidence', 'ip_address',
+                    'cnames', 'headers', 'timestamp'}
+LEGACY_SUCCESS_KEYS = LEGACY_BASE_KEYS | {
+    'cms', 'cms_version', 'server', 'language', 'frameworks', 'analytics',
+    'security', 'ssl', 'domain_info', 'email_security', 'hosting_provider',
+    'performance',
+}
+
+HTML = (
+    '<html><head><meta name="generator" content="WordPress 6.4.2">'
+    '<script src="/wp-content/app.js"></script><script>gtag("js")</script>'
+    '<div id="__next">react</div></head></html>'
+)
+
+
+class FakeResponse:
+    def __init__(self):
+        self.headers = CaseInsensitiveDict({
+            'Server': 'nginx',
+            'X-Powered-By': 'PHP/8.2',
+            'CF-Ray': '8000000000000000-AMS',
+            'Strict-Transport-Security': 'max-age=31536000',
+            'Content-Encoding': 'gzip',
+            'Content-Length': '2048',
+        })
+        self.text = HTML
+
+
+class FakeCname:
+    target = 'example.com.cdn.cloudflare.net.'
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Replace every network call made by check_cdn with canned data"""
+    def fake_resolve(name, rdtype):
+        if rdtype == 'CNAME' and not name.startswith('www.'):
+            return [FakeCname()]
+        raise dns.resolver.NoAnswer()
+
+    monkeypatch.setattr(app.requests, 'get', lambda *a, **k: FakeResponse())
+    monkeypatch.setattr(app.socket, 'gethostbyname', lambda domain: '104.16.0.1')
+    monkeypatch.setattr(app.dns.resolver, 'resolve', fake_resolve)
+    monkeypatch.setattr(app, 'get_ssl_info', lambda domain: {
+        'issuer': "Let's Encrypt", 'subject': domain, 'valid_until': '2030-01-01',
+        'days_remaining': 1000, 'tls_version': 'TLSv1.3', 'status': 'Valid'})
+    monkeypatch.setattr(app, 'get_domain_info', lambda domain: {
+        'age_years': 10, 'age_days': 3650, 'created': '2015-01-01',
+        'expires': '2030-01-01', 'registrar': 'Example Registrar'})
+    monkeypatch.setattr(app, 'detect_hosting_provider', lambda ip, domain: 'Cloudflare')
+
+
+def test_error_path_keeps_legacy_shape():
+    data = app.check_cdn('not a url!!').to_dict()
+    assert set(data) == LEGACY_BASE_KEYS | {'error'}
+    assert data['headers'] == {}
+    assert data['evidence'] == [] and data['cnames'] == []
+
+
+def test_success_path_keeps_legacy_shape(offline):
+    data = app.check_cdn('example.com').to_dict()
+    assert set(data) == LEGACY_SUCCESS_KEYS
+    assert data['cdn_detected'] == 'CloudFlare'
+    assert data['cms'] == 'WordPress' and data['cms_version'] == '6.4.2'
+    assert data['headers']['Server'] == 'nginx'
+    assert set(data['security']) == {'score', 'max_score', 'headers', 'grade'}
+    assert set(data['email_security']) == {'spf', 'dmarc', 'mx'}
+
+
+def test_api_check_response_matches_to_dict(offline):
+    response = app.app.test_client().post('/api/check', json={'url': 'example.com'})
+    assert response.status_code == 200
+    body = json.loads(response.get_data(as_text=True))
+    assert set(body) == LEGACY_SUCCESS_KEYS
+    assert "Header 'cf-ray' → CloudFlare" in body['evidence']
+
+
+def test_headers_only_stored_on_request(offline):
+    result = app.check_cdn('example.com', include_headers=False)
+    assert result.headers is None
+    assert result.to_dict()['headers'] == {}
+
+
+def test_names_are_interned(offline):
+    result = app.check_cdn('example.com')
+    assert result.cdn_detected is app.sys.intern('CloudFlare')
+    assert result.server is app.sys.intern('nginx')
+
+
+def test_compact_omits_empty_values():
+    compact = app.check_cdn('not a url!!').to_compact()
+    assert set(compact) == {'url', 'confidence', 'error', 'ts'}
+    assert all(value is not None and value != [] for value in compact.values())
+
+
+def test_compact_success_is_flat(offline):
+    compact = app.check_cdn('example.com').to_compact()
+    assert compact['cdn'] == 'CloudFlare'
+    assert compact['security_grade'] and compact['tls'] == 'TLSv1.3'
+    assert 'mx' not in compact  # no MX records -> empty list dropped
+    assert not any(isinstance(value, dict) for value in compact.values())
+
+
+def test_json_provider_honours_ensure_ascii():
+    provider = app.app.json
+    assert provider.dumps({'a': 'é'}) == '{"a":"é"}'
+    assert provider.dumps({'a': 'é'}, ensure_ascii=True) == '{"a": "\\u00e9"}'
+    assert json.loads(provider.dumps({'b': 1, 'a': 2}, indent=2)) == {'a': 2, 'b': 1}
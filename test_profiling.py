@@ -0,0 +1,79 @@
+"""
+Tests for the on-demand /api/check profiler and the /api/profiles endpoint
+"""
+
+import os
+import time
+
+import pytest
+
+import app
+
+TOKEN = 'test-token'
+
+
+def slow_check(url, *args, **kwargs):
+    """Stand-in for check_cdn whose duration is encoded in the URL (e.g. 'a.com/30')"""
+    time.sleep(int(url.rsplit('/', 1)[1]) / 1000)
+    return app.CheckResult(url, 'now')
+
+
+@pytest.fixture
+def profiling(monkeypatch):
+    monkeypatch.setattr(app, 'PROFILE_TOKEN', TOKEN)
+    monkeypatch.setattr(app, 'profile_store', app.ProfileStore(keep=2))
+    monkeypatch.setattr(app, 'check_cdn', slow_check)
+    return app.app.test_client()
+
+
+def profiled_post(client, url):
+    return client.post('/api/check', json={'url': url}, headers={'X-Profile-Token': TOKEN})
+
+
+def test_profiles_hidden_without_token(monkeypatch):
+    monkeypatch.setattr(app, 'PROFILE_TOKEN', '')
+    response = app.app.test_client().get('/api/profiles', headers={'X-Profile-Token': ''})
+    assert response.status_code == 404
+
+
+def test_profiles_reject_bad_token(profiling):
+    assert profiling.get('/api/profiles').status_code == 403
+    assert profiling.get('/api/profiles', headers={'X-Profile-Token': 'wrong'}).status_code == 403
+
+
+def test_unprofiled_requests_are_not_recorded(profiling, monkeypatch):
+    monkeypatch.setattr(app, 'PROFILE_SAMPLE_RATE', 0)
+    profiling.post('/api/check', json={'url': 'a.com/1'})
+    assert app.profile_store.slowest() == []
+
+
+def test_keeps_only_slowest_traces(profiling):
+    for url in ('a.com/40', 'b.com/5', 'c.com/20'):
+        assert profiled_post(profiling, url).status_code == 200
+
+    body = profiling.get('/api/profiles', headers={'X-Profile-Token': TOKEN}).get_json()
+    assert body['pid'] == os.getpid()
+    assert [trace['url'] for trace in body['traces']] == ['a.com/40', 'c.com/20']
+
+    trace = body['traces'][0]
+    assert trace['pid'] == os.getpid()
+    assert trace['duration_ms'] >= 40
+    # Sleeping is off-CPU time
+    assert trace['off_cpu_ms'] > trace['cpu_ms']
+
+
+def test_collapsed_format(profiling):
+    profiled_post(profiling, 'a.com/50')
+    response = profiling.get('/api/profiles?format=collapsed', headers={'X-Profile-Token': TOKEN})
+
+    assert response.mimetype == 'text/plain'
+    assert response.headers['X-Profile-Worker'] == str(os.getpid())
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0
+        assert all(':' in frame for frame in stack.split(';'))
+    # Frames are module-qualified, so Flask's app module and ours stay distinct
+    assert any('app:profiled_check_cdn;test_profiling:slow_check' in line for line in lines)
+    assert any('flask.app:Flask.wsgi_app' in line for line in lines)
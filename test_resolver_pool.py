@@ -0,0 +1,179 @@
+"""
+Tests for the bulk-mode ResolverPool against local UDP/TCP stub nameservers
+"""
+
+import socket
+import struct
+import threading
+
+import dns.message
+import dns.rcode
+import dns.rrset
+import pytest
+
+import app
+
+
+class StubNameserver:
+    """Minimal nameserver on a loopback address answering UDP (and TCP) with a handler.
+
+    handler(query, udp) returns a list of responses to send (possibly empty);
+    every received query is recorded in self.queries.
+    """
+
+    def __init__(self, handler, host='127.0.0.1', port=0):
+        self.handler = handler
+        self.host = host
+        self.queries = []
+        self.tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.tcp.bind((host, port))
+        self.port = self.tcp.getsockname()[1]
+        self.tcp.listen(8)
+        self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp.bind((host, self.port))
+        threading.Thread(target=self._serve_udp, daemon=True).start()
+        threading.Thread(target=self._serve_tcp, daemon=True).start()
+
+    def _serve_udp(self):
+        while True:
+            try:
+                wire, addr = self.udp.recvfrom(65535)
+            except OSError:
+                return
+            query = dns.message.from_wire(wire)
+            self.queries.append(query)
+            for response in self.handler(query, True):
+                self.udp.sendto(response.to_wire(), addr)
+
+    def _serve_tcp(self):
+        while True:
+            try:
+                conn, _ = self.tcp.accept()
+            except OSError:
+                return
+            with conn:
+                length = struct.unpack('!H', conn.recv(2))[0]
+                query = dns.message.from_wire(conn.recv(length))
+                self.queries.append(query)
+                for response in self.handler(query, False):
+                    wire = response.to_wire()
+                    conn.sendall(struct.pack('!H', len(wire)) + wire)
+
+    def close(self):
+        self.udp.close()
+        self.tcp.close()
+
+
+def txt_answer(query, text='v=spf1 -all'):
+    response = dns.message.make_response(query)
+    name = query.question[0].name
+    response.answer.append(dns.rrset.from_text(name, 60, 'IN', 'TXT', f'"{text}"'))
+    return response
+
+
+def rcode_answer(query, rcode):
+    response = dns.message.make_response(query)
+    response.set_rcode(rcode)
+    return response
+
+
+@pytest.fixture
+def stubs():
+    servers = []
+
+    def start(handler, **kwargs):
+        server = StubNameserver(handler, **kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def make_pool(*servers, **kwargs):
+    kwargs.setdefault('timeout', 0.5)
+    kwargs.setdefault('backoff', 0.01)
+    return app.ResolverPool([server.host for server in servers], port=servers[0].port, **kwargs)
+
+
+def test_replies_are_matched_by_message_id(stubs):
+    def handler(query, udp):
+        stray = txt_answer(query, 'stray')
+        stray.id = (query.id + 1) % 0x10000
+        return [stray, txt_answer(query)]
+
+    server = stubs(handler)
+    pool = make_pool(server)
+    results = pool.resolve_many([('Example.com.', 'TXT'), ('example.org', 'TXT')])
+
+    assert [str(r) for r in results[('example.com', 'TXT')]] == ['"v=spf1 -all"']
+    assert [str(r) for r in results[('example.org', 'TXT')]] == ['"v=spf1 -all"']
+    assert pool.stats['127.0.0.1']['answers'] == 2
+
+
+def test_queries_use_edns(stubs):
+    server = stubs(lambda query, udp: [txt_answer(query)])
+    make_pool(server).resolve_many([('example.com', 'TXT')])
+    assert server.queries[0].edns == 0
+    assert server.queries[0].payload == app.ResolverPool.EDNS_PAYLOAD
+
+
+def test_servfail_is_retried_on_the_next_upstream(stubs):
+    failing = stubs(lambda query, udp: [rcode_answer(query, dns.rcode.SERVFAIL)])
+    # Second upstream on another loopback address, same port
+    healthy = stubs(lambda query, udp: [txt_answer(query)], host='127.0.0.2', port=failing.port)
+    pool = make_pool(failing, healthy)
+    results = pool.resolve_many([(f'd{i}.example', 'TXT') for i in range(6)])
+
+    assert len(results) == 6
+    # Half the names start on the failing upstream; none is sent back there on retry
+    assert len(failing.queries) == 3
+    assert len(healthy.queries) == 6
+    assert pool.stats['127.0.0.1']['servfail'] == 3
+    assert pool.stats['127.0.0.2']['answers'] == 6
+
+
+def test_timeouts_expire_and_give_up_after_all_attempts(stubs):
+    server = stubs(lambda query, udp: [])
+    pool = make_pool(server, timeout=0.1, attempts=2)
+    results = pool.resolve_many([('example.com', 'TXT')])
+
+    assert results == {}
+    assert len(server.queries) == 2
+    assert pool.stats['127.0.0.1']['timeouts'] == 2
+
+
+def test_nxdomain_gives_empty_list(stubs):
+    server = stubs(lambda query, udp: [rcode_answer(query, dns.rcode.NXDOMAIN)])
+    results = make_pool(server).resolve_many([('missing.example', 'MX')])
+    assert results == {('missing.example', 'MX'): []}
+
+
+def test_truncated_answer_is_retried_over_tcp(stubs):
+    def handler(query, udp):
+        if udp:
+            response = dns.message.make_response(query)
+            response.flags |= dns.flags.TC
+            return [response]
+        return [txt_answer(query, 'x' * 200)]
+
+    server = stubs(handler)
+    pool = make_pool(server)
+    results = pool.resolve_many([('big.example', 'TXT')])
+
+    assert [str(r) for r in results[('big.example', 'TXT')]] == ['"' + 'x' * 200 + '"']
+    stats = pool.report()['127.0.0.1']
+    assert stats['truncated'] == 1 and stats['answers'] == 1 and stats['tcp_errors'] == 0
+    assert stats['avg_ms'] is not None
+
+
+def test_prefetched_answers_feed_email_security():
+    query = dns.message.make_query('example.com', 'TXT')
+    dns_answers = {
+        ('example.com', 'TXT'): app.answer_records(txt_answer(query), 'TXT'),
+        ('_dmarc.example.com', 'TXT'): [],
+        ('example.com', 'MX'): [],
+    }
+    assert app.get_email_security('www.example.com', dns_answers) == {
+        'spf': 'Configured', 'dmarc': 'Not found', 'mx': []}